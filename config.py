@@ -1,6 +1,10 @@
+from functools import cached_property
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import List, Any, Literal
-from pydantic import validator, EmailStr
+from pydantic import validator, computed_field, EmailStr, TypeAdapter
+
+# EmailStr 只作為載入設定時的一次性驗證步驟，欄位本身以一般字串儲存
+_EMAIL_ADAPTER = TypeAdapter(EmailStr)
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8', extra='ignore')
@@ -8,19 +12,30 @@ class Settings(BaseSettings):
     # Line Bot API Keys
     LINE_CHANNEL_ACCESS_TOKEN: str
     LINE_CHANNEL_SECRET: str
+    LINE_HTTP_TIMEOUT_SECONDS: float = 10 # LINE API 單次請求的總逾時（秒），0 表示不設總逾時
 
     # Google Sheets Settings
     GOOGLE_SHEETS_CREDENTIALS_JSON: str # 或路徑，建議使用 Secret Manager
     GOOGLE_SHEET_ID: str
     GOOGLE_SHEET_WORKSHEET_NAME: str = "工作表1" # 預設工作表名稱
+    GSHEET_BATCH_WINDOW_MS: int = 100 # 合併寫入的時間窗口（毫秒）
+    GSHEET_BATCH_MAX_SIZE: int = 50 # 單次批次寫入的最大列數
+    GSHEET_POOL_SIZE: int = 8 # 事件迴圈預設線程池大小（gspread 的阻塞 I/O 在此執行）
+    GSHEET_REAUTH_INTERVAL_MINUTES: int = 720 # 重建 gspread 客戶端（與其 HTTPS 連線池）的間隔（分鐘）
+    GSHEET_DISK_CACHE_PATH: str = "" # 標題行與序號欄的本機快取檔（預設停用；僅適用於重啟後檔案仍保留的主機，Cloud Run 的 /tmp 不會保留）
 
     # SMTP Settings for Email
     SMTP_SERVER: str
     SMTP_PORT: int = 587
     SMTP_USERNAME: str
     SMTP_PASSWORD: str
-    EMAIL_SENDER: EmailStr
-    EMAIL_RECEIVER: List[EmailStr] # 收件人信箱，在 .env 中用逗號分隔
+    EMAIL_SENDER: str
+    EMAIL_RECEIVER: List[str] # 收件人信箱，在 .env 中用逗號分隔
+    SMTP_KEEPALIVE_INTERVAL: int = 60 # 持久連線 NOOP 保活間隔（秒）
+
+    # LINE 使用者資料快取
+    PROFILE_CACHE_TTL_SECONDS: int = 600
+    PROFILE_CACHE_MAX_SIZE: int = 10000
 
     # Line Bot Admin User ID (optional)
     LINE_ADMIN_USER_ID: str = ""
@@ -31,15 +46,26 @@ class Settings(BaseSettings):
     # Docker container port
     PORT: int = 8080 # For Cloud Run
 
+    @validator('EMAIL_SENDER')
+    def validate_email_sender(cls, v: str) -> str:
+        """驗證寄件人信箱格式"""
+        return str(_EMAIL_ADAPTER.validate_python(v))
+
     @validator('EMAIL_RECEIVER', pre=True)
     def parse_email_list(cls, v: Any) -> List[str]:
-        """允許從逗號分隔的字串解析收件人列表"""
+        """允許從逗號分隔的字串解析收件人列表，並驗證每個信箱格式"""
         if isinstance(v, str):
-            return [email.strip() for email in v.split(',')]
+            v = [email.strip() for email in v.split(',')]
         if isinstance(v, list):
-            return v
+            return [str(_EMAIL_ADAPTER.validate_python(email)) for email in v]
         raise ValueError("EMAIL_RECEIVER must be a comma-separated string or a list")
 
+    @computed_field
+    @cached_property
+    def email_receiver_header(self) -> str:
+        """收件人列表組成的 To 標頭字串，只在首次存取時計算一次"""
+        return ", ".join(self.EMAIL_RECEIVER)
+
     @validator('PORT', 'SMTP_PORT')
     def validate_port(cls, v: int) -> int:
         """驗證端口號是否在有效範圍內"""
@@ -47,4 +73,5 @@ class Settings(BaseSettings):
             raise ValueError('Port number must be between 1 and 65535')
         return v
 
+# 全域唯一的設定實例：驗證只在此處執行一次，其他模組請直接匯入 settings，勿重新建立 Settings()
 settings = Settings()
\ No newline at end of file
@@ -47,12 +47,15 @@ ENV_VARS_CONFIG=(
 )
 ENV_VARS_PARAM=$(IFS=,; echo "${ENV_VARS_CONFIG[*]}")
 
+# 序號由應用程式內的本地計數器分配（見 utils/async_gsheet_connector.py 的 get_new_serial），
+# 多個執行個體會各自從工作表初始化並發出重複序號，因此必須限制為單一執行個體
 gcloud run deploy "${SERVICE_NAME}" \
   --image "gcr.io/${PROJECT_ID}/${SERVICE_NAME}" \
   --platform managed \
   --region "${REGION}" \
   --allow-unauthenticated \
   --port 8080 \
+  --max-instances 1 \
   --set-env-vars="${ENV_VARS_PARAM}" \
   --set-secrets="${SECRETS_PARAM}"
 
@@ -1,15 +1,29 @@
+import sys
 import uvicorn
+import asyncio
 import logging
+import fastapi
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Response
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 
 from routers import line_webhook, commands
 # 導入正確的連接器
-from utils.async_gsheet_connector import get_gsheet_connector, GSheetApiClientError
+from utils.async_gsheet_connector import (
+    AsyncGSheetConnector,
+    GSheetApiClientError,
+    get_gsheet,
+    get_gsheet_connector,
+)
 from utils.logger import setup_logging
 # 導入 LINE API 客戶端管理器
 from utils.line_api_client import close_line_api, line_api_health_check, get_line_api_metrics
+from utils.smtp_client import close_smtp_client
+from utils.gsheet_batcher import get_gsheet_batcher, close_gsheet_batcher
+from services.line_message_handler import wait_for_background_tasks
 from config import settings
 
 # 在應用程式啟動的最開始就設定日誌系統
@@ -17,6 +31,23 @@ setup_logging()
 
 logger = logging.getLogger(__name__)
 
+# 程序生命週期內不會改變的版本資訊，於模組載入時計算一次
+_PY_VERSION = f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}"
+_FASTAPI_VERSION = fastapi.__version__
+
+def _utc_now_iso() -> str:
+    """端點回應用的 UTC 時間戳，精確到秒即可，省去微秒格式化"""
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+def _build_health_body(app: FastAPI) -> bytes:
+    """組合基本健康檢查的回應內容（不含時間戳，時間由 HTTP Date 標頭提供）"""
+    return orjson.dumps({
+        "status": getattr(app.state, 'startup_status', 'unknown'),
+        "startup_time": getattr(app.state, 'startup_time', 'unknown'),
+        "startup_duration": getattr(app.state, 'startup_duration', 0),
+        "version": "1.0.0"
+    })
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 應用程式啟動時執行的程式碼
@@ -28,12 +59,25 @@ async def lifespan(app: FastAPI):
         'line_api': {'status': 'unknown', 'error': None}
     }
     
+    # gspread-asyncio 沒有指定 executor 的參數，一律透過事件迴圈的預設 executor 執行 gspread 的阻塞呼叫，
+    # 因此無法為其建立獨立的線程池；在此只依 Sheets I/O 調整預設線程池的大小，
+    # 其他 run_in_executor/to_thread 工作（例如本機快取檔寫入）仍共用此線程池
+    app.state.default_executor = ThreadPoolExecutor(
+        max_workers=settings.GSHEET_POOL_SIZE,
+        thread_name_prefix="default-executor"
+    )
+    asyncio.get_running_loop().set_default_executor(app.state.default_executor)
+    
     try:
         # 1. 初始化並預熱 Google Sheets 連接
         logger.info("Initializing and warming up Google Sheets connection...")
         try:
             gsheet_connector = await get_gsheet_connector()
+            # 存放於應用程式狀態，供健康檢查等端點共用同一個已預熱的連接器
+            app.state.gsheet_connector = gsheet_connector
             await gsheet_connector.get_worksheet()  # 驗證連線並預熱快取
+            # 啟動背景批次寫入任務
+            (await get_gsheet_batcher()).start()
             startup_checks['google_sheets']['status'] = 'healthy'
             logger.info("✓ Google Sheets connection verified and cache warmed up.")
         except GSheetApiClientError as e:
@@ -89,6 +133,9 @@ async def lifespan(app: FastAPI):
     app.state.startup_checks = startup_checks
     app.state.startup_duration = (datetime.now(timezone.utc) - startup_time).total_seconds()
     
+    # 基本健康檢查的內容在啟動後不再變動，預先編碼為 JSON bytes
+    app.state.health_cache = _build_health_body(app)
+    
     logger.info(f"Application startup completed in {app.state.startup_duration:.3f}s with status: {startup_status}")
 
     yield
@@ -100,7 +147,25 @@ async def lifespan(app: FastAPI):
     shutdown_errors = []
     
     try:
-        # 1. 關閉 LINE API 客戶端
+        # 0. 等待背景任務（通知郵件）完成，避免在發送途中關閉 SMTP 連線
+        try:
+            await wait_for_background_tasks()
+        except Exception as e:
+            error_msg = f"✗ Error waiting for background tasks: {e}"
+            logger.error(error_msg, exc_info=True)
+            shutdown_errors.append(error_msg)
+        
+        # 1. 寫入批次器佇列中剩餘的資料（需在關閉其他客戶端前完成）
+        logger.info("Flushing pending Google Sheets rows...")
+        try:
+            await close_gsheet_batcher()
+            logger.info("✓ Google Sheets batcher flushed successfully.")
+        except Exception as e:
+            error_msg = f"✗ Error flushing Google Sheets batcher: {e}"
+            logger.error(error_msg, exc_info=True)
+            shutdown_errors.append(error_msg)
+        
+        # 2. 關閉 LINE API 客戶端
         logger.info("Closing LINE API client...")
         try:
             await close_line_api()
@@ -110,10 +175,25 @@ async def lifespan(app: FastAPI):
             logger.error(error_msg, exc_info=True)
             shutdown_errors.append(error_msg)
         
-        # 2. 可以添加其他清理邏輯
-        # 例如：關閉資料庫連接、清理快取等
+        # 3. 關閉持久的 SMTP 連線
+        logger.info("Closing SMTP client...")
+        try:
+            await close_smtp_client()
+            logger.info("✓ SMTP client closed successfully.")
+        except Exception as e:
+            error_msg = f"✗ Error closing SMTP client: {e}"
+            logger.error(error_msg, exc_info=True)
+            shutdown_errors.append(error_msg)
         
-        # 3. 記錄關閉完成狀態
+        # 4. 關閉預設線程池，等待已排入的 to_thread 工作完成（不阻塞事件迴圈）
+        try:
+            await asyncio.get_running_loop().shutdown_default_executor()
+        except Exception as e:
+            error_msg = f"✗ Error shutting down default executor: {e}"
+            logger.error(error_msg, exc_info=True)
+            shutdown_errors.append(error_msg)
+        
+        # 5. 記錄關閉完成狀態
         shutdown_duration = (datetime.now(timezone.utc) - shutdown_time).total_seconds()
         
         if shutdown_errors:
@@ -129,6 +209,7 @@ async def lifespan(app: FastAPI):
 
 app = FastAPI(
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     title="LINE Bot Service",
     description="A FastAPI-based LINE Bot with Google Sheets integration",
     version="1.0.0"
@@ -141,19 +222,15 @@ app.include_router(commands.router, prefix="/commands", tags=["Admin Commands"])
 # 健康檢查端點
 @app.get("/health")
 async def basic_health_check():
-    """基本健康檢查"""
-    startup_status = getattr(app.state, 'startup_status', 'unknown')
+    """基本健康檢查 - 直接回傳啟動時快取的 JSON 內容"""
+    body = getattr(app.state, 'health_cache', None)
+    if body is None:
+        body = _build_health_body(app)
     
-    return {
-        "status": startup_status,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "startup_time": getattr(app.state, 'startup_time', 'unknown'),
-        "startup_duration": getattr(app.state, 'startup_duration', 0),
-        "version": "1.0.0"
-    }
+    return Response(content=body, media_type="application/json")
 
 @app.get("/health/detailed")
-async def detailed_health_check():
+async def detailed_health_check(gsheet_connector: AsyncGSheetConnector = Depends(get_gsheet)):
     """詳細健康檢查 - 包含實時檢查"""
     checks = {}
     
@@ -176,7 +253,6 @@ async def detailed_health_check():
     
     # 3. 實時 Google Sheets 檢查
     try:
-        gsheet_connector = await get_gsheet_connector()
         await gsheet_connector.get_worksheet()
         checks["google_sheets_realtime"] = {"status": "healthy"}
     except GSheetApiClientError as e:
@@ -204,7 +280,7 @@ async def detailed_health_check():
     
     return {
         "status": overall_status,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": _utc_now_iso(),
         "startup_time": getattr(app.state, 'startup_time', 'unknown'),
         "startup_duration": getattr(app.state, 'startup_duration', 0),
         "version": "1.0.0",
@@ -223,7 +299,7 @@ async def get_metrics():
         line_metrics = await get_line_api_metrics()
         
         return {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": _utc_now_iso(),
             "application": {
                 "name": "LINE Bot Service",
                 "version": "1.0.0",
@@ -233,8 +309,8 @@ async def get_metrics():
             },
             "line_api": line_metrics,
             "system": {
-                "python_version": f"{__import__('sys').version_info.major}.{__import__('sys').version_info.minor}.{__import__('sys').version_info.micro}",
-                "fastapi_version": __import__('fastapi').__version__
+                "python_version": _PY_VERSION,
+                "fastapi_version": _FASTAPI_VERSION
             }
         }
     except Exception as e:
@@ -248,7 +324,7 @@ async def root():
         "service": "LINE Bot Service",
         "version": "1.0.0",
         "status": getattr(app.state, 'startup_status', 'unknown'),
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": _utc_now_iso(),
         "endpoints": {
             "health": "/health",
             "detailed_health": "/health/detailed",
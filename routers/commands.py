@@ -1,4 +1,3 @@
-import asyncio
 from fastapi import APIRouter, Depends, HTTPException
 from linebot.v3.messaging import (
     MessagingApi,
@@ -6,7 +5,7 @@ from linebot.v3.messaging import (
     TextMessage as V3TextMessage,
 )
 from utils.line_api_client import get_messaging_api
-from services.email_sender import send_notification_email
+from services.async_email_sender import send_notification_email
 from config import settings
 
 router = APIRouter()
@@ -14,8 +13,8 @@ router = APIRouter()
 @router.post("/send-test-email")
 async def send_test_email_command(messaging_api: MessagingApi = Depends(get_messaging_api)):
     try:
-        # 在獨立線程中執行同步的郵件發送，避免阻塞
-        await asyncio.to_thread(send_notification_email, "測試主旨", "這是一封來自 Line Bot 的測試郵件。")
+        # 直接在事件迴圈上非同步發送郵件，不需額外的線程切換
+        await send_notification_email("測試主旨", "這是一封來自 Line Bot 的測試郵件。")
         # 發送 Line 訊息通知管理員郵件已發送
         if settings.LINE_ADMIN_USER_ID:
             await messaging_api.push_message(PushMessageRequest(
@@ -1,26 +1,33 @@
-from fastapi import APIRouter, Header, Request, HTTPException, Depends
+from fastapi import APIRouter, Header, Request, Response, HTTPException, Depends
 import logging
 import asyncio
+import base64
+import hashlib
+import hmac
+
+import orjson
 
 # 引入 line-bot-sdk v3 的類別
-from linebot.v3.webhook import WebhookParser
 from linebot.v3.messaging import MessagingApi
-from linebot.v3.exceptions import InvalidSignatureError
-from linebot.v3.webhooks import (
-    MessageEvent,
-    TextMessageContent,
-)
+from linebot.v3.webhooks import MessageEvent
 
 from config import settings
 from services.line_message_handler import handle_message
 # 使用正確的 LINE API 客戶端
 from utils.line_api_client import get_messaging_api
+from utils.logger import DEBUG_TRACEBACKS
+from utils.profile_cache import profile_cache
 
 router = APIRouter()
 logger = logging.getLogger("linebot_logger")
 
-# 在模組層級初始化 v3 的事件解析器
-parser = WebhookParser(settings.LINE_CHANNEL_SECRET)
+# 在模組層級預先編碼頻道密鑰，供簽名驗證直接使用
+_CHANNEL_SECRET = settings.LINE_CHANNEL_SECRET.encode("utf-8")
+
+def _is_valid_signature(body: bytes, signature: str) -> bool:
+    """直接對原始位元組計算 HMAC-SHA256 並以常數時間比對簽名"""
+    mac = hmac.new(_CHANNEL_SECRET, body, hashlib.sha256).digest()
+    return hmac.compare_digest(base64.b64encode(mac), signature.encode("utf-8"))
 
 @router.post("/callback")
 async def line_webhook_callback(
@@ -34,50 +41,69 @@ async def line_webhook_callback(
     """
     try:
         body = await request.body()
-        body_str = body.decode("utf-8")
         
         # 驗證請求簽名
         if not x_line_signature:
             logger.error("Missing X-Line-Signature header")
             raise HTTPException(status_code=400, detail="Missing signature header")
         
-        # 解析 webhook 事件
-        try:
-            events = parser.parse(body_str, x_line_signature)
-        except InvalidSignatureError as e:
-            logger.error(f"Invalid signature: {e}")
+        if not _is_valid_signature(body, x_line_signature):
+            logger.error("Invalid signature")
             raise HTTPException(status_code=400, detail="Invalid signature")
-        except Exception as e:
-            logger.error(f"Failed to parse webhook events: {e}")
+        
+        # 解析 webhook 事件（直接解析原始位元組，不經過 SDK 的完整模型驗證）
+        try:
+            events = orjson.loads(body)["events"]
+            # 與 SDK 的 WebhookParser 相同，格式不符的請求回傳 400，避免 LINE 平台因 5xx 重送
+            if not isinstance(events, list):
+                raise TypeError(f"'events' must be a list, got {type(events).__name__}")
+        except (orjson.JSONDecodeError, KeyError, TypeError) as e:
+            logger.error("Failed to parse webhook events: %s", e)
             raise HTTPException(status_code=400, detail="Failed to parse events")
         
         # 記錄收到的事件數量
-        logger.info(f"Received {len(events)} webhook events")
+        logger.info("Received %s webhook events", len(events))
         
         # 並行處理所有訊息事件
         tasks = []
         for event in events:
-            if isinstance(event, MessageEvent) and isinstance(event.message, TextMessageContent):
-                logger.debug(f"Processing message event from user: {event.source.user_id}")
-                # 注意：這裡只傳遞兩個參數，已修正原本的錯誤
-                tasks.append(handle_message(event, messaging_api))
+            if not isinstance(event, dict):
+                logger.debug("Skipping malformed webhook event: %r", event)
+                continue
+            message = event.get("message") if event.get("type") == "message" else None
+            if isinstance(message, dict) and message.get("type") == "text":
+                # 只有需要處理的文字訊息事件才建立 SDK 模型
+                try:
+                    message_event = MessageEvent.from_dict(event)
+                except Exception as e:
+                    logger.error("Failed to build message event: %s", e)
+                    continue
+                logger.debug("Processing message event from user: %s", message_event.source.user_id)
+                tasks.append(handle_message(message_event, messaging_api))
             else:
-                logger.debug(f"Skipping non-text message event: {type(event)}")
+                # 加好友/封鎖時使用者資料可能已變更，清除快取的顯示名稱
+                source = event.get("source")
+                if event.get("type") in ("follow", "unfollow") and isinstance(source, dict):
+                    profile_cache.invalidate(source.get("userId"))
+                logger.debug("Skipping non-text message event: %s", event.get('type'))
         
         # 等待所有任務完成
+        # 各處理函數會自行捕獲並回覆錯誤，因此不需 return_exceptions 收集結果；
+        # 若仍有異常漏出，gather 不會取消其他任務，並由下方記錄
         if tasks:
             try:
-                await asyncio.gather(*tasks, return_exceptions=True)
-                logger.info(f"Successfully processed {len(tasks)} message events")
+                await asyncio.gather(*tasks)
+                logger.info("Successfully processed %s message events", len(tasks))
             except Exception as e:
-                logger.error(f"Error in batch processing events: {e}")
+                logger.error("Error in batch processing events: %s", e)
                 # 不拋出異常，因為部分事件可能已成功處理
         
-        return {"status": "ok", "processed_events": len(tasks)}
+        # LINE 平台只需要 200 狀態碼，回傳純文字以省去 JSON 序列化
+        return Response(content=b"OK", media_type="text/plain")
         
     except HTTPException:
         # 重新拋出 HTTP 異常
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in webhook callback: {e}", exc_info=True)
+        logger.error("Unexpected error in webhook callback: %s", e, exc_info=DEBUG_TRACEBACKS)
         raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
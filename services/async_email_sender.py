@@ -1,29 +1,25 @@
 import logging
-import aiosmtplib
 from email.mime.text import MIMEText
 from email.header import Header
 from config import settings
+from utils.logger import DEBUG_TRACEBACKS
+from utils.smtp_client import get_smtp_manager
 
 logger = logging.getLogger(__name__)
 
 async def send_notification_email(subject: str, body: str):
     """
-    使用 aiosmtplib 非同步地發送通知郵件。
+    使用共用的持久 SMTP 連線非同步地發送通知郵件。
+    發送失敗時記錄錯誤並重新拋出異常，由呼叫端決定如何處理。
     """
     message = MIMEText(body, 'plain', 'utf-8')
     message['From'] = Header(settings.EMAIL_SENDER, 'utf-8')
-    message['To'] = Header(", ".join(settings.EMAIL_RECEIVER), 'utf-8')
+    message['To'] = Header(settings.email_receiver_header, 'utf-8')
     message['Subject'] = Header(subject, 'utf-8')
 
     try:
-        await aiosmtplib.send(
-            message,
-            hostname=settings.SMTP_SERVER,
-            port=settings.SMTP_PORT,
-            username=settings.SMTP_USERNAME,
-            password=settings.SMTP_PASSWORD,
-            use_tls=True
-        )
-        logger.info(f"Email notification sent successfully. Subject: '{subject}'")
+        await get_smtp_manager().send_message(message)
+        logger.info("Email notification sent successfully. Subject: '%s'", subject)
     except Exception as e:
-        logger.error(f"Failed to send email notification: {e}", exc_info=True)
\ No newline at end of file
+        logger.error("Failed to send email notification: %s", e, exc_info=DEBUG_TRACEBACKS)
+        raise
\ No newline at end of file
@@ -1,5 +1,8 @@
+import asyncio
 import logging
 from datetime import datetime, timezone, timedelta
+from types import MappingProxyType
+from typing import Awaitable, Callable, Final, Mapping, Set
 
 from linebot.v3.exceptions import LineBotApiError
 from linebot.v3.messaging import (
@@ -7,26 +10,113 @@ from linebot.v3.messaging import (
     MessagingApi,
     ReplyMessageRequest,
     TextMessage,
-    TextMessageContent,
 )
 
 from services.async_email_sender import send_notification_email
-from utils.async_gsheet_connector import get_gsheet_connector, GSheetApiClientError
+from utils.async_gsheet_connector import GSheetApiClientError
+from utils.gsheet_batcher import get_gsheet_batcher
+from utils.logger import DEBUG_TRACEBACKS
+from utils.profile_cache import get_display_name
+
+__all__ = [
+    "handle_message",
+    "handle_register_command",
+    "wait_for_background_tasks",
+]
 
 logger = logging.getLogger(__name__)
 TAIWAN_TZ = timezone(timedelta(hours=+8))
 
+# 序號分配與使用者資料查詢的時間上限（秒）；LINE 回覆權杖約 30 秒後失效，
+# 保留足夠時間讓逾時後的錯誤回覆仍能送達
+_REGISTER_TIMEOUT_SECONDS = 15
+
+def _fmt_taiwan_now() -> str:
+    """以 YYYY-MM-DD HH:MM:SS 格式回傳台灣現在時間（手動格式化，避開 strftime 的 locale 處理）"""
+    d = datetime.now(TAIWAN_TZ)
+    return f"{d.year:04d}-{d.month:02d}-{d.day:02d} {d.hour:02d}:{d.minute:02d}:{d.second:02d}"
+
+# line-bot-sdk 的模型依 pydantic 版本不同，提供 model_construct（v2）或 construct（v1）
+_construct_text_message = getattr(TextMessage, 'model_construct', None) or getattr(TextMessage, 'construct', None)
+_construct_reply_request = (getattr(ReplyMessageRequest, 'model_construct', None)
+                            or getattr(ReplyMessageRequest, 'construct', None))
+
+def _construct_text_reply(reply_token: str, text: str) -> ReplyMessageRequest:
+    """略過欄位驗證直接建立回覆請求（輸入皆為已知安全的字串）"""
+    return _construct_reply_request(
+        reply_token=reply_token,
+        messages=[_construct_text_message(text=text, type='text')]
+    )
+
+def _validated_text_reply(reply_token: str, text: str) -> ReplyMessageRequest:
+    """經完整驗證建立回覆請求"""
+    return ReplyMessageRequest(reply_token=reply_token, messages=[TextMessage(text=text)])
+
+# 模組載入時確認略過驗證的建構結果能正常序列化；若 SDK 升級改變了模型結構則退回一般建構
+try:
+    _construct_ok = (_construct_text_reply("token", "text").to_dict()
+                     == _validated_text_reply("token", "text").to_dict())
+except Exception:
+    _construct_ok = False
+_text_reply = _construct_text_reply if _construct_ok else _validated_text_reply
+
+# 保留背景任務的強參照，避免任務在執行途中被垃圾回收
+_background_tasks: Set[asyncio.Task] = set()
+
+def _log_task_exception(task: asyncio.Task):
+    """背景任務結束時的回呼，記錄未處理的異常"""
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.error("Background task %s failed: %s", task.get_name(), exc)
+
+def _spawn_background(coro: Awaitable[None], name: str) -> asyncio.Task:
+    """建立背景任務並確保其異常會被記錄"""
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    task.add_done_callback(_log_task_exception)
+    return task
+
+async def wait_for_background_tasks(timeout: float = 10.0):
+    """
+    應用程式關閉時調用，等待尚未完成的背景任務（例如通知郵件）
+    需在關閉 SMTP 連線之前呼叫，逾時則放棄等待
+    """
+    if not _background_tasks:
+        return
+    pending = list(_background_tasks)
+    logger.info("Waiting for %s background tasks to finish", len(pending))
+    _, not_done = await asyncio.wait(pending, timeout=timeout)
+    if not_done:
+        logger.warning("%s background tasks still running after %ss", len(not_done), timeout)
+
 async def _reply_with_error(messaging_api: MessagingApi, event: MessageEvent, text: str):
     """發送錯誤回覆的輔助函數"""
     try:
-        await messaging_api.reply_message(
-            ReplyMessageRequest(
-                reply_token=event.reply_token,
-                messages=[TextMessage(text=text)]
-            )
-        )
+        await messaging_api.reply_message(_text_reply(event.reply_token, text))
     except LineBotApiError as e:
-        logger.error(f"Failed to send error message to user {event.source.user_id}: {e}")
+        logger.error("Failed to send error message to user %s: %s", event.source.user_id, e)
+
+async def _get_user_name(messaging_api: MessagingApi, user_id: str) -> str:
+    """獲取使用者顯示名稱（優先使用快取），失敗時使用預設名稱"""
+    try:
+        return await get_display_name(messaging_api, user_id)
+    except LineBotApiError as e:
+        logger.warning("Failed to get profile for %s: %s", user_id, e)
+        return "使用者"
+
+async def _finalize_registration(
+    written: "asyncio.Future", new_serial: int, user_id: str, user_name: str, timestamp_str: str
+):
+    """背景完成的登記收尾工作：等待資料確實寫入 Google Sheets 後發送通知郵件"""
+    await written
+    await send_notification_email(
+        subject=f"新的登記訊息 - 序號 {new_serial}",
+        body=f"用戶 {user_name} (ID: {user_id}) 於 {timestamp_str} 登記，序號為 {new_serial}。"
+    )
+    logger.info("Notification email sent for serial: %s", new_serial)
 
 async def handle_register_command(event: MessageEvent, messaging_api: MessagingApi):
     """處理登記命令"""
@@ -36,74 +126,73 @@ async def handle_register_command(event: MessageEvent, messaging_api: MessagingA
         return
 
     try:
-        # 獲取使用者資料
-        user_name = "使用者"
-        try:
-            profile = await messaging_api.get_profile(user_id)
-            user_name = profile.display_name
-        except LineBotApiError as e:
-            logger.warning(f"Failed to get profile for {user_id}: {e}")
-
-        # 獲取 Google Sheets 連接器
-        gsheet_connector = await get_gsheet_connector()
+        # 獲取 Google Sheets 寫入批次器
+        gsheet_batcher = await get_gsheet_batcher()
         
-        # 執行登記流程
-        logger.info(f"Starting registration for: {user_name} ({user_id})")
-        new_serial = await gsheet_connector.get_new_serial()
-        timestamp_str = datetime.now(TAIWAN_TZ).strftime("%Y-%m-%d %H:%M:%S")
-        row_data = [new_serial, user_id, user_name, timestamp_str]
+        # 序號分配與使用者資料查詢互不相依，同時進行；
+        # 設定時間上限，避免冷啟動時 Sheets 呼叫卡住而耗盡回覆權杖的有效時間
+        new_serial, user_name = await asyncio.wait_for(
+            asyncio.gather(
+                gsheet_batcher.reserve_serial(),
+                _get_user_name(messaging_api, user_id)
+            ),
+            timeout=_REGISTER_TIMEOUT_SECONDS
+        )
         
-        await gsheet_connector.append_row(row_data)
-        logger.info(f"Data written to GSheet with serial: {new_serial}")
+        # 執行登記流程：實際寫入由背景批次完成
+        logger.info("Starting registration for: %s (%s)", user_name, user_id)
+        timestamp_str = _fmt_taiwan_now()
+        written = gsheet_batcher.enqueue([new_serial, user_id, user_name, timestamp_str])
+        logger.info("Row queued for GSheet with serial: %s", new_serial)
 
-        # 回覆使用者
-        reply_text = f"您好 {user_name}，您的登記已完成。\n序號：{new_serial}\n時間：{timestamp_str}"
-        await messaging_api.reply_message(
-            ReplyMessageRequest(
-                reply_token=event.reply_token,
-                messages=[TextMessage(text=reply_text)]
-            )
+        # 資料已排入寫入佇列，通知郵件不依賴回覆結果；
+        # 先於背景啟動收尾任務，讓 Sheets 寫入、SMTP 與下方的 LINE 回覆同時進行
+        _spawn_background(
+            _finalize_registration(written, new_serial, user_id, user_name, timestamp_str),
+            name=f"finalize-registration-{new_serial}"
         )
 
-        # 發送通知郵件（非阻塞）
-        try:
-            await send_notification_email(
-                subject=f"新的登記訊息 - 序號 {new_serial}",
-                body=f"用戶 {user_name} (ID: {user_id}) 於 {timestamp_str} 登記，序號為 {new_serial}。"
-            )
-            logger.info(f"Notification email sent for serial: {new_serial}")
-        except Exception as email_error:
-            logger.error(f"Failed to send notification email: {email_error}")
+        # 回覆使用者，回覆延遲只取決於 LINE API
+        reply_text = f"您好 {user_name}，您的登記已完成。\n序號：{new_serial}\n時間：{timestamp_str}"
+        await messaging_api.reply_message(_text_reply(event.reply_token, reply_text))
 
+    except asyncio.TimeoutError:
+        logger.error("Registration timed out after %ss for user %s", _REGISTER_TIMEOUT_SECONDS, user_id)
+        await _reply_with_error(messaging_api, event, "抱歉，系統忙碌中，請稍後再試。")
     except GSheetApiClientError as e:
-        logger.error(f"GSheet API error for user {user_id}: {e}")
+        logger.error("GSheet API error for user %s: %s", user_id, e)
         await _reply_with_error(messaging_api, event, "抱歉，系統暫時無法連接到資料庫，請稍後再試。")
     except LineBotApiError as e:
-        logger.error(f"LINE API error when replying to {user_id}: {e}")
+        logger.error("LINE API error when replying to %s: %s", user_id, e)
     except Exception as e:
-        logger.error(f"Unexpected error for user {user_id}: {e}", exc_info=True)
+        logger.error("Unexpected error for user %s: %s", user_id, e, exc_info=DEBUG_TRACEBACKS)
         await _reply_with_error(messaging_api, event, "抱歉，系統發生未預期的錯誤，請聯繫管理員。")
 
+# 指令分派表：在模組載入時建立一次的唯讀映射，以去除前後空白的完整訊息查找處理函數
+_COMMAND_HANDLERS: Final[Mapping[str, Callable[[MessageEvent, MessagingApi], Awaitable[None]]]] = MappingProxyType({
+    "登記": handle_register_command,
+})
+
 async def handle_message(event: MessageEvent, messaging_api: MessagingApi):
     """
     主要訊息處理函數 - 已修正參數問題
     """
-    if not isinstance(event.message, TextMessageContent):
+    # 以字串屬性判斷訊息類型，省去對 Pydantic 模型類別的 isinstance 檢查
+    if getattr(event.message, 'type', None) != 'text':
         return
 
-    text = event.message.text.strip().lower()
+    raw_text = event.message.text
 
-    if text == "登記":
-        await handle_register_command(event, messaging_api)
+    # 整則訊息須與指令完全相符（與原本的 == 比對相同，「登記 123」不會觸發登記）；
+    # 中文指令沒有大小寫之分，只有在原字串未命中時才轉小寫再查一次
+    stripped = raw_text.strip()
+    handler = _COMMAND_HANDLERS.get(stripped) or _COMMAND_HANDLERS.get(stripped.lower())
+    if handler is not None:
+        await handler(event, messaging_api)
     else:
         # 預設回覆
-        reply_text = f"您說了「{event.message.text}」。\n若要登記，請輸入「登記」。"
+        reply_text = f"您說了「{raw_text}」。\n若要登記，請輸入「登記」。"
         try:
-            await messaging_api.reply_message(
-                ReplyMessageRequest(
-                    reply_token=event.reply_token, 
-                    messages=[TextMessage(text=reply_text)]
-                )
-            )
+            await messaging_api.reply_message(_text_reply(event.reply_token, reply_text))
         except LineBotApiError as e:
-            logger.error(f"Failed to send default reply: {e}")
\ No newline at end of file
+            logger.error("Failed to send default reply: %s", e)
\ No newline at end of file
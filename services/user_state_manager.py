@@ -1,53 +1,58 @@
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+import threading
+import time
+from typing import Dict, Any, List, Optional
 import logging
 
+from cachetools import TTLCache
+
 logger = logging.getLogger(__name__)
 
+# 分片數量（必須為 2 的次方，才能以位元運算取代取餘數）
+_SHARD_COUNT = 16
+
 class UserStateManager:
     """
     一個具備 TTL (Time-To-Live) 功能的用戶狀態管理器。
     它會在記憶體中儲存用戶狀態，並在狀態過期後自動清理，防止記憶體洩漏。
     """
-    def __init__(self, default_ttl_seconds: int = 300):
+    def __init__(self, default_ttl_seconds: int = 300, max_size: int = 100_000):
         """
         初始化用戶狀態管理器。
         :param default_ttl_seconds: 狀態的默認存活時間（秒）。預設為 5 分鐘。
+        :param max_size: 最多保留的用戶狀態數量，超過時淘汰最久未使用的狀態。
         """
-        self._states: Dict[str, Dict[str, Any]] = {}
-        self.default_ttl = timedelta(seconds=default_ttl_seconds)
-
-    def _is_expired(self, user_id: str) -> bool:
-        """檢查指定用戶的狀態是否已過期。"""
-        if user_id not in self._states:
-            return True
-        
-        last_updated = self._states[user_id].get("last_updated")
-        if not last_updated:
-            logger.warning(f"State for user {user_id} has no timestamp. Considering it expired.")
-            return True
+        # TTLCache 以單次查找同時處理過期與 LRU 淘汰，過期項目會在存取時自動清除。
+        # TTLCache 本身並非線程安全，依用戶 ID 分片並各自加鎖，不同用戶的存取不會互相競爭
+        shard_size = -(-max_size // _SHARD_COUNT)
+        self._shards: "List[TTLCache[str, Dict[str, Any]]]" = [
+            TTLCache(maxsize=shard_size, ttl=default_ttl_seconds, timer=time.monotonic)
+            for _ in range(_SHARD_COUNT)
+        ]
+        self._locks: List[threading.Lock] = [threading.Lock() for _ in range(_SHARD_COUNT)]
 
-        return datetime.now() > last_updated + self.default_ttl
+    def _shard_index(self, user_id: str) -> int:
+        """計算用戶所屬的分片"""
+        return hash(user_id) & (_SHARD_COUNT - 1)
 
     def set_user_state(self, user_id: str, state: Dict[str, Any]):
-        """設置或更新用戶的狀態，並記錄時間戳。"""
-        self._states[user_id] = {
-            "data": state,
-            "last_updated": datetime.now()
-        }
+        """設置或更新用戶的狀態，並重新計算存活時間。"""
+        i = self._shard_index(user_id)
+        with self._locks[i]:
+            self._shards[i][user_id] = state
         logger.debug(f"State set for user {user_id}: {state}")
 
     def get_user_state(self, user_id: str) -> Optional[Dict[str, Any]]:
-        """獲取用戶的狀態。如果狀態已過期，則清除並返回 None。"""
-        if self._is_expired(user_id):
-            self.clear_user_state(user_id)
-            return None
-        return self._states[user_id].get("data")
+        """獲取用戶的狀態。如果狀態已過期，則返回 None。"""
+        i = self._shard_index(user_id)
+        with self._locks[i]:
+            return self._shards[i].get(user_id)
 
     def clear_user_state(self, user_id: str):
         """從管理器中清除用戶的狀態。"""
-        if user_id in self._states:
-            del self._states[user_id]
+        i = self._shard_index(user_id)
+        with self._locks[i]:
+            removed = self._shards[i].pop(user_id, None)
+        if removed is not None:
             logger.info(f"Cleared state for user {user_id}.")
 
 # 創建一個全域單例，方便在應用程式各處使用
@@ -1,12 +1,25 @@
 import asyncio
+import functools
 import logging
-from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
-import json
+import os
+import tempfile
+import time
+from typing import Optional, List, Dict, Any, Tuple
 
-import gspread_asyncio
-from oauth2client.service_account import ServiceAccountCredentials
+import orjson
+from fastapi import Request
 from config import settings
+from utils.logger import DEBUG_TRACEBACKS
+
+__all__ = [
+    "GSheetApiClientError",
+    "AsyncGSheetConnector",
+    "get_gsheet_connector",
+    "get_gsheet",
+    "load_credentials_info",
+    "get_gsheet_credentials",
+    "GSHEET_SCOPES",
+]
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +27,47 @@ class GSheetApiClientError(Exception):
     """Google Sheets API 客戶端異常"""
     pass
 
+GSHEET_SCOPES = (
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive'
+)
+
+# A..ZZ 欄位字母對照表（涵蓋 702 欄），建立 A1 範圍時直接查表
+_COL_LETTERS = tuple(
+    [chr(65 + i) for i in range(26)] +
+    [chr(65 + i) + chr(65 + j) for i in range(26) for j in range(26)]
+)
+
+def _col_letter(col: int) -> str:
+    """欄號（從 1 開始）轉為欄位字母，超出對照表時才退回 gspread 的轉換"""
+    if 0 < col <= len(_COL_LETTERS):
+        return _COL_LETTERS[col - 1]
+    from gspread.utils import rowcol_to_a1
+    return rowcol_to_a1(1, col)[:-1]
+
+@functools.cache
+def load_credentials_info() -> Dict[str, Any]:
+    """
+    解析環境變數中的服務帳戶憑證，結果在整個行程中只計算一次
+    重新授權時的 auth_callback 直接重用，不需再次解析 JSON
+    """
+    try:
+        return orjson.loads(settings.GOOGLE_SHEETS_CREDENTIALS_JSON)
+    except orjson.JSONDecodeError as e:
+        error_msg = f"Invalid JSON in GOOGLE_SHEETS_CREDENTIALS_JSON: {e}"
+        logger.error(error_msg)
+        raise GSheetApiClientError(error_msg) from e
+
+@functools.cache
+def get_gsheet_credentials():
+    """
+    建立服務帳戶憑證物件，整個行程共用同一個實例
+    憑證物件會自行刷新存取權杖，重新授權時不需再次載入 RSA 私鑰
+    """
+    from google.oauth2.service_account import Credentials
+    
+    return Credentials.from_service_account_info(load_credentials_info(), scopes=GSHEET_SCOPES)
+
 class AsyncGSheetConnector:
     """
     非同步 Google Sheets 連接器
@@ -23,49 +77,182 @@ class AsyncGSheetConnector:
     def __init__(self):
         self._client_manager = None
         self._worksheet_cache = None
-        self._cache_timestamp = None
-        self._cache_ttl = timedelta(minutes=5)
+        # 快取時間使用單調時鐘，不受系統時間調整影響；
+        # 工作表快取直接記錄到期時間，檢查時只需一次比較（0 表示尚無快取）
+        self._worksheet_valid_until: float = 0.0
+        self._cache_ttl_seconds: float = 300
         self._lock = asyncio.Lock()
+        # 本地序號計數器，僅在首次使用或重設後從工作表取得起始值。
+        # 計數器只存在於本行程中，部署時必須只有單一行程/執行個體（deploy.sh 以 --max-instances 1 限制，
+        # Dockerfile 的 uvicorn 也只啟動一個 worker），否則各行程會發出相同的序號
+        self._last_serial: Optional[int] = None
+        self._serial_lock = asyncio.Lock()
+        # 標題行快取與欄位名稱 -> 欄號（從 1 開始）的對照表
+        self._header: Optional[List[str]] = None
+        self._header_index: Dict[str, int] = {}
+        self._header_fetched_at: Optional[float] = None
+        # 序號欄（第一欄）快取，查詢與更新時在本地尋找列號，省去 find() 的 API 呼叫
+        self._serial_column: Optional[List[str]] = None
+        self._serial_column_fetched_at: Optional[float] = None
+        self._serial_to_row: Dict[str, int] = {}
+        # 本機快取檔同一時間只由一個背景任務寫入；寫入期間又有更新時由該任務再寫一次
+        self._disk_cache_task: Optional[asyncio.Task] = None
+        self._disk_cache_dirty = False
+        self._revalidate_task: Optional[asyncio.Task] = None
+        # 行程重啟後先沿用本機快取檔中仍在有效期內的標題行與序號欄，首次取得工作表後在背景重新驗證
+        self._disk_cache_loaded = False
+        self._load_disk_cache()
+    
+    def _load_disk_cache(self):
+        """
+        從本機快取檔載入標題行與序號欄
+        有效期自原始讀取時間起算，與記憶體快取相同，因此沿用的資料不會比一般快取更舊
+        """
+        path = settings.GSHEET_DISK_CACHE_PATH
+        if not path:
+            return
+        # 快取檔只是選用的加速手段，任何讀取、解析或格式錯誤都只忽略該檔案，不影響連接器建立
+        try:
+            with open(path, 'rb') as f:
+                data = orjson.loads(f.read())
+            
+            # 快取檔只適用於同一份工作表
+            if (not isinstance(data, dict) or
+                    data.get('sheet_id') != settings.GOOGLE_SHEET_ID or
+                    data.get('worksheet') != settings.GOOGLE_SHEET_WORKSHEET_NAME):
+                return
+            
+            now_wall = time.time()
+            header = self._disk_cache_entry(data, 'header', now_wall)
+            serials = self._disk_cache_entry(data, 'serials', now_wall)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning("Ignoring unreadable GSheet disk cache %s: %s", path, e)
+            return
+        
+        # 檔案記錄的是牆上時間，換算為本行程的單調時間
+        offset = time.monotonic() - now_wall
+        if header is not None:
+            self._set_header(header[0], fetched_at=header[1] + offset)
+            self._disk_cache_loaded = True
+        if serials is not None:
+            self._serial_column = serials[0]
+            self._serial_column_fetched_at = serials[1] + offset
+            self._serial_to_row = self._index_serials(serials[0])
+            self._disk_cache_loaded = True
+        if self._disk_cache_loaded:
+            logger.info("Loaded GSheet header/serial cache from %s", path)
+    
+    def _disk_cache_entry(self, data: Dict[str, Any], key: str,
+                          now_wall: float) -> Optional[Tuple[List[str], float]]:
+        """
+        取出快取檔中仍在有效期內的項目
+        :return: (值, 讀取時的牆上時間)；格式不符、已過期或時間晚於現在（時鐘回撥）時為 None
+        """
+        values, ts = data.get(key), data.get(f'{key}_ts')
+        if (not isinstance(values, list) or not all(isinstance(v, str) for v in values) or
+                not isinstance(ts, (int, float)) or isinstance(ts, bool)):
+            return None
+        if not 0 <= now_wall - ts < self._cache_ttl_seconds:
+            return None
+        return values, float(ts)
+    
+    async def _revalidate_disk_cache(self, worksheet):
+        """從工作表重新讀取標題行與序號欄，取代由快取檔載入、可能已被手動修改的內容"""
+        try:
+            self._set_header(await worksheet.row_values(1))
+            await self._get_serial_column(refresh=True)
+            logger.info("GSheet header/serial cache revalidated from sheet")
+        except Exception as e:
+            logger.warning("Failed to revalidate GSheet disk cache: %s", e, exc_info=DEBUG_TRACEBACKS)
+    
+    def _save_disk_cache(self):
+        """排程寫入本機快取檔；實際的檔案 I/O 在執行緒中進行，不阻塞事件迴圈"""
+        if not settings.GSHEET_DISK_CACHE_PATH:
+            return
+        self._disk_cache_dirty = True
+        if self._disk_cache_task is None or self._disk_cache_task.done():
+            self._disk_cache_task = asyncio.create_task(self._flush_disk_cache())
+    
+    async def _flush_disk_cache(self):
+        """寫入最新的快取內容，直到沒有新的變更為止"""
+        while self._disk_cache_dirty:
+            self._disk_cache_dirty = False
+            await asyncio.to_thread(self._write_disk_cache, self._disk_cache_snapshot())
+    
+    def _disk_cache_snapshot(self) -> Dict[str, Any]:
+        """目前的標題行與序號欄（時間換算為牆上時間，供其他行程使用）"""
+        offset = time.time() - time.monotonic()
+        return {
+            'sheet_id': settings.GOOGLE_SHEET_ID,
+            'worksheet': settings.GOOGLE_SHEET_WORKSHEET_NAME,
+            'header': self._header,
+            'header_ts': self._header_fetched_at + offset if self._header_fetched_at is not None else None,
+            'serials': self._serial_column,
+            'serials_ts': (self._serial_column_fetched_at + offset
+                           if self._serial_column_fetched_at is not None else None),
+        }
+    
+    @staticmethod
+    def _write_disk_cache(data: Dict[str, Any]):
+        """先寫入唯一的暫存檔再替換，避免讀到寫到一半的檔案，或與其他行程共用同一個暫存檔"""
+        path = settings.GSHEET_DISK_CACHE_PATH
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or '.',
+                                             prefix=f"{os.path.basename(path)}.",
+                                             suffix='.tmp', delete=False) as f:
+                tmp_path = f.name
+                f.write(orjson.dumps(data))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Failed to write GSheet disk cache %s: %s", path, e)
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
     
     async def _get_client_manager(self):
         """獲取 gspread-asyncio 客戶端管理器"""
         if self._client_manager is None:
             try:
-                # 從環境變數載入憑證
-                creds_dict = json.loads(settings.GOOGLE_SHEETS_CREDENTIALS_JSON)
+                # gspread-asyncio 載入成本高，延遲到首次建立客戶端時才匯入
+                import gspread_asyncio
                 
-                def auth_callback():
-                    scope = [
-                        'https://spreadsheets.google.com/feeds',
-                        'https://www.googleapis.com/auth/drive'
-                    ]
-                    return ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
+                # 先建立一次憑證，設定錯誤會在此直接拋出；之後重新授權時重用同一個憑證物件
+                get_gsheet_credentials()
                 
-                self._client_manager = gspread_asyncio.AsyncioGspreadClientManager(auth_callback)
+                # gspread 客戶端內的 AuthorizedSession 會自行刷新存取權杖並保持 HTTPS 連線池；
+                # 每次重新授權都會建立新的 session 並重新進行 TLS 握手，因此拉長重新授權間隔以重用連線
+                self._client_manager = gspread_asyncio.AsyncioGspreadClientManager(
+                    get_gsheet_credentials,
+                    reauth_interval=settings.GSHEET_REAUTH_INTERVAL_MINUTES
+                )
                 logger.info("Async Google Sheets client manager initialized")
                 
-            except json.JSONDecodeError as e:
-                error_msg = f"Invalid JSON in GOOGLE_SHEETS_CREDENTIALS_JSON: {e}"
-                logger.error(error_msg)
-                raise GSheetApiClientError(error_msg)
+            except GSheetApiClientError:
+                raise
             except Exception as e:
                 error_msg = f"Failed to initialize async gspread client: {e}"
-                logger.error(error_msg, exc_info=True)
-                raise GSheetApiClientError(error_msg)
+                logger.error(error_msg, exc_info=DEBUG_TRACEBACKS)
+                raise GSheetApiClientError(error_msg) from e
         
         return self._client_manager
     
     async def get_worksheet(self):
         """
         獲取工作表，使用快取提升性能
+        快取有效時不需進入鎖；過期時只有第一個協程重新獲取，其餘協程等待並重用其結果
         """
+        # 快速路徑：快取有效時直接返回
+        if self._is_worksheet_cached():
+            return self._worksheet_cache
+        
         async with self._lock:
-            now = datetime.now()
-            
-            # 檢查快取是否有效
-            if (self._worksheet_cache is not None and 
-                self._cache_timestamp is not None and 
-                now - self._cache_timestamp < self._cache_ttl):
+            # 雙重檢查：等待鎖期間可能已由其他協程完成刷新
+            if self._is_worksheet_cached():
                 return self._worksheet_cache
             
             try:
@@ -78,69 +265,211 @@ class AsyncGSheetConnector:
                 
                 # 更新快取
                 self._worksheet_cache = worksheet
-                self._cache_timestamp = now
+                self._worksheet_valid_until = time.monotonic() + self._cache_ttl_seconds
+                
+                if self._disk_cache_loaded:
+                    # 快取檔的內容可能已過時，先繼續使用，並在背景從工作表重新讀取
+                    self._disk_cache_loaded = False
+                    self._revalidate_task = asyncio.create_task(self._revalidate_disk_cache(worksheet))
                 
-                logger.debug(f"Worksheet '{settings.GOOGLE_SHEET_WORKSHEET_NAME}' loaded and cached")
+                logger.debug("Worksheet '%s' loaded and cached", settings.GOOGLE_SHEET_WORKSHEET_NAME)
                 return worksheet
                 
             except Exception as e:
                 error_msg = f"Failed to get worksheet: {e}"
-                logger.error(error_msg, exc_info=True)
-                raise GSheetApiClientError(error_msg)
+                logger.error(error_msg, exc_info=DEBUG_TRACEBACKS)
+                raise GSheetApiClientError(error_msg) from e
+    
+    def _is_worksheet_cached(self) -> bool:
+        """工作表快取是否仍有效"""
+        return time.monotonic() < self._worksheet_valid_until
+    
+    def invalidate_cache(self):
+        """清除工作表、標題行與序號欄快取，下次存取時重新讀取"""
+        self._worksheet_cache = None
+        self._worksheet_valid_until = 0.0
+        self._header = None
+        self._header_index = {}
+        self._header_fetched_at = None
+        self._invalidate_serial_column()
+    
+    async def _get_header(self) -> Tuple[List[str], Dict[str, int]]:
+        """
+        獲取標題行及欄位對照表，快取時間與工作表快取相同
+        標題只在表格結構調整時才會變動，不需每次呼叫都重新讀取
+        """
+        if self._is_header_cached():
+            return self._header, self._header_index
+        
+        worksheet = await self.get_worksheet()
+        self._set_header(await worksheet.row_values(1))
+        self._save_disk_cache()
+        return self._header, self._header_index
+    
+    def _set_header(self, header: List[str], fetched_at: Optional[float] = None):
+        """更新標題行快取並重建欄位對照表"""
+        self._header = header
+        self._header_index = {name: i + 1 for i, name in enumerate(header)}
+        self._header_fetched_at = fetched_at if fetched_at is not None else time.monotonic()
+    
+    def _is_header_cached(self) -> bool:
+        """標題行快取是否仍有效"""
+        return (self._header is not None and
+                self._header_fetched_at is not None and
+                time.monotonic() - self._header_fetched_at < self._cache_ttl_seconds)
+    
+    async def _get_serial_column(self, refresh: bool = False) -> Tuple[List[str], bool]:
+        """
+        獲取序號欄的所有值，快取時間與工作表快取相同
+        :return: (序號欄的值, 是否為本次剛從工作表讀取)
+        """
+        if (not refresh and self._serial_column is not None and
+                self._serial_column_fetched_at is not None and
+                time.monotonic() - self._serial_column_fetched_at < self._cache_ttl_seconds):
+            return self._serial_column, False
+        
+        worksheet = await self.get_worksheet()
+        self._serial_column = await worksheet.col_values(1)
+        self._serial_column_fetched_at = time.monotonic()
+        self._serial_to_row = self._index_serials(self._serial_column)
+        self._save_disk_cache()
+        return self._serial_column, True
+    
+    @staticmethod
+    def _index_serials(column: List[str]) -> Dict[str, int]:
+        """建立序號 -> 列號（從 1 開始）的索引；重複的序號以第一次出現的列為準，與 find() 一致"""
+        index: Dict[str, int] = {}
+        for row, value in enumerate(column, start=1):
+            if value and value not in index:
+                index[value] = row
+        return index
+    
+    def _invalidate_serial_column(self):
+        """清除序號欄快取"""
+        self._serial_column = None
+        self._serial_column_fetched_at = None
+        self._serial_to_row = {}
+    
+    async def _find_serial_row(self, serial: str) -> Optional[int]:
+        """
+        以快取的序號索引在本地查找序號所在的列號（從 1 開始）
+        快取中找不到時（例如剛新增的序號）重新讀取一次序號欄
+        """
+        target = str(serial)
+        _, fresh = await self._get_serial_column()
+        row = self._serial_to_row.get(target)
+        if row is None and not fresh:
+            await self._get_serial_column(refresh=True)
+            row = self._serial_to_row.get(target)
+        return row
+    
+    async def _verify_serial_rows(self, worksheet, serials) -> Dict[str, int]:
+        """
+        以快取的序號索引解析列號，並以單次 batch_get 讀回各列的序號欄確認仍相符
+        :return: 序號 -> 已確認的列號（找不到或不相符的序號不包含在內）
+        """
+        candidates = [(serial, self._serial_to_row.get(str(serial))) for serial in serials]
+        candidates = [(serial, row) for serial, row in candidates if row is not None]
+        if not candidates:
+            return {}
+        
+        value_ranges = await worksheet.batch_get([f"A{row}" for _, row in candidates])
+        return {
+            serial: row
+            for (serial, row), values in zip(candidates, value_ranges)
+            if values and values[0] and values[0][0] == str(serial)
+        }
+    
+    async def _fetch_last_serial(self) -> int:
+        """從工作表讀取最後一個數字序號"""
+        # 獲取第一列的所有值（只在計數器初始化時讀取一次，並作為序號欄快取）
+        col_values, _ = await self._get_serial_column(refresh=True)
+        
+        # 找到最後一個數字序號；完整檢查 isdigit，避免 int() 解析到非數字內容
+        return next((int(value) for value in reversed(col_values) if value.isdigit()), 0)
     
     async def get_new_serial(self) -> int:
-        """獲取新的序號"""
-        try:
-            worksheet = await self.get_worksheet()
-            # 獲取第一列的所有值
-            col_values = await worksheet.col_values(1)
-            
-            if not col_values:
-                return 1
-            
-            # 找到最後一個數字序號
-            last_serial = 0
-            for value in reversed(col_values):
-                if value.isdigit():
-                    last_serial = int(value)
-                    break
-            
-            return last_serial + 1
-            
-        except Exception as e:
-            logger.error(f"Failed to get new serial: {e}", exc_info=True)
-            raise GSheetApiClientError(f"Failed to get new serial: {e}")
+        """
+        獲取新的序號
+        只在首次呼叫（或 reset_serial 之後）讀取整個序號欄，之後於本地遞增
+        """
+        async with self._serial_lock:
+            try:
+                if self._last_serial is None:
+                    self._last_serial = await self._fetch_last_serial()
+                    logger.info("Serial counter seeded from sheet: %s", self._last_serial)
+                
+                self._last_serial += 1
+                return self._last_serial
+                
+            except Exception as e:
+                self.reset_serial()
+                logger.error("Failed to get new serial: %s", e, exc_info=DEBUG_TRACEBACKS)
+                raise GSheetApiClientError(f"Failed to get new serial: {e}") from e
+    
+    def reset_serial(self):
+        """重設序號計數器，下一次 get_new_serial 會重新從工作表讀取"""
+        self._last_serial = None
     
     async def append_row(self, row_data: List[Any]):
         """新增一行資料"""
         try:
-            worksheet = await self.get_worksheet()
+            # 寫入熱路徑：快取有效時直接使用，省去 get_worksheet 的協程呼叫
+            worksheet = (self._worksheet_cache if time.monotonic() < self._worksheet_valid_until
+                         else await self.get_worksheet())
             await worksheet.append_row(row_data)
-            logger.info(f"Row appended successfully: {row_data}")
+            logger.info("Row appended successfully: %s", row_data)
             
         except Exception as e:
             error_msg = f"Failed to append row: {e}"
-            logger.error(error_msg, exc_info=True)
-            raise GSheetApiClientError(error_msg)
+            logger.error(error_msg, exc_info=DEBUG_TRACEBACKS)
+            raise GSheetApiClientError(error_msg) from e
+    
+    async def append_rows(self, rows: List[List[Any]]):
+        """以單次 API 呼叫新增多行資料"""
+        try:
+            worksheet = (self._worksheet_cache if time.monotonic() < self._worksheet_valid_until
+                         else await self.get_worksheet())
+            await worksheet.append_rows(rows)
+            logger.info("%s rows appended successfully", len(rows))
+            
+        except Exception as e:
+            error_msg = f"Failed to append {len(rows)} rows: {e}"
+            logger.error(error_msg, exc_info=DEBUG_TRACEBACKS)
+            raise GSheetApiClientError(error_msg) from e
+    
+    async def _read_row(self, worksheet, row: int) -> Tuple[List[str], List[str]]:
+        """讀取指定列；標題行已快取時只需讀取資料行，否則以單次 batch_get 同時獲取"""
+        if self._is_header_cached():
+            return self._header, await worksheet.row_values(row)
+        
+        header_range, row_range = await worksheet.batch_get(['1:1', f'{row}:{row}'])
+        header_values = list(header_range[0]) if header_range else []
+        row_values = list(row_range[0]) if row_range else []
+        self._set_header(header_values)
+        self._save_disk_cache()
+        return header_values, row_values
     
     async def find_row_by_serial(self, serial: str) -> Optional[Dict[str, Any]]:
         """根據序號查找行資料"""
         try:
             worksheet = await self.get_worksheet()
             
-            # 尋找序號
-            try:
-                cell = await worksheet.find(str(serial), in_column=1)
-            except Exception:
-                logger.warning(f"Serial {serial} not found")
-                return None
-            
-            if not cell:
+            # 以快取的序號欄尋找列號
+            row = await self._find_serial_row(serial)
+            if row is None:
+                logger.warning("Serial %s not found", serial)
                 return None
             
-            # 獲取標題行和資料行
-            header_values = await worksheet.row_values(1)
-            row_values = await worksheet.row_values(cell.row)
+            header_values, row_values = await self._read_row(worksheet, row)
+            if not row_values or row_values[0] != str(serial):
+                # 快取的列號已過時（例如工作表被手動調整），重新讀取序號欄後再試一次
+                self._invalidate_serial_column()
+                row = await self._find_serial_row(serial)
+                if row is None:
+                    logger.warning("Serial %s not found", serial)
+                    return None
+                header_values, row_values = await self._read_row(worksheet, row)
             
             # 確保長度一致
             while len(row_values) < len(header_values):
@@ -150,40 +479,94 @@ class AsyncGSheetConnector:
             
         except Exception as e:
             error_msg = f"Failed to find row by serial {serial}: {e}"
-            logger.error(error_msg, exc_info=True)
-            raise GSheetApiClientError(error_msg)
+            logger.error(error_msg, exc_info=DEBUG_TRACEBACKS)
+            raise GSheetApiClientError(error_msg) from e
     
     async def update_status_by_serial(self, serial: str, new_status: str) -> bool:
         """根據序號更新狀態"""
         try:
             worksheet = await self.get_worksheet()
             
-            # 尋找序號
-            try:
-                cell = await worksheet.find(str(serial), in_column=1)
-            except Exception:
-                logger.warning(f"Serial {serial} not found for status update")
-                return False
-            
-            if not cell:
+            # 以快取的序號欄尋找列號
+            row = await self._find_serial_row(serial)
+            if row is not None and (await worksheet.acell(f"A{row}")).value != str(serial):
+                # 快取的列號已過時（例如工作表被手動調整），重新讀取序號欄後再確認一次，避免寫到別人的列
+                self._invalidate_serial_column()
+                row = await self._find_serial_row(serial)
+                if row is not None and (await worksheet.acell(f"A{row}")).value != str(serial):
+                    row = None
+            if row is None:
+                logger.warning("Serial %s not found for status update", serial)
                 return False
             
-            # 找到狀態欄位
-            header_values = await worksheet.row_values(1)
-            try:
-                status_col_idx = header_values.index('處理狀態') + 1
-            except ValueError:
+            # 從快取的欄位對照表找到狀態欄位
+            _, header_index = await self._get_header()
+            status_col_idx = header_index.get('處理狀態')
+            if status_col_idx is None:
+                # 標題可能已被修改，清除快取讓下次重新讀取
+                self.invalidate_cache()
                 raise GSheetApiClientError("Column '處理狀態' not found in header")
             
             # 更新狀態
-            await worksheet.update_cell(cell.row, status_col_idx, new_status)
-            logger.info(f"Status updated for serial {serial}: {new_status}")
+            await worksheet.update_cell(row, status_col_idx, new_status)
+            logger.info("Status updated for serial %s: %s", serial, new_status)
             return True
             
         except Exception as e:
             error_msg = f"Failed to update status for serial {serial}: {e}"
-            logger.error(error_msg, exc_info=True)
-            raise GSheetApiClientError(error_msg)
+            logger.error(error_msg, exc_info=DEBUG_TRACEBACKS)
+            raise GSheetApiClientError(error_msg) from e
+
+    async def update_statuses_by_serial(self, updates: Dict[str, str]) -> Dict[str, bool]:
+        """
+        以單次 batch_update（spreadsheets.values.batchUpdate）更新多筆序號的狀態
+        :param updates: 序號 -> 新狀態
+        :return: 序號 -> 是否找到並更新
+        """
+        try:
+            worksheet = await self.get_worksheet()
+            
+            _, header_index = await self._get_header()
+            status_col_idx = header_index.get('處理狀態')
+            if status_col_idx is None:
+                # 標題可能已被修改，清除快取讓下次重新讀取
+                self.invalidate_cache()
+                raise GSheetApiClientError("Column '處理狀態' not found in header")
+            
+            # 所有更新都在同一欄，欄位字母只需計算一次
+            status_col = _col_letter(status_col_idx)
+            
+            # 整批最多重新讀取一次序號欄：快取中缺少任何序號時才刷新
+            _, fresh = await self._get_serial_column()
+            if not fresh and any(str(serial) not in self._serial_to_row for serial in updates):
+                _, fresh = await self._get_serial_column(refresh=True)
+            rows = await self._verify_serial_rows(worksheet, updates)
+            if not fresh and len(rows) < sum(str(s) in self._serial_to_row for s in updates):
+                # 有列號已過時（例如工作表被手動調整），重新讀取序號欄後再確認一次
+                await self._get_serial_column(refresh=True)
+                rows = await self._verify_serial_rows(worksheet, updates)
+            
+            # 只更新已確認序號仍在該列的資料，未找到的序號不納入請求
+            results: Dict[str, bool] = {}
+            data = []
+            for serial, new_status in updates.items():
+                row = rows.get(serial)
+                results[serial] = row is not None
+                if row is None:
+                    logger.warning("Serial %s not found for status update", serial)
+                    continue
+                data.append({'range': f"{status_col}{row}", 'values': [[new_status]]})
+            
+            if data:
+                # 與 update_cell 相同以 USER_ENTERED 寫入
+                await worksheet.batch_update(data, value_input_option='USER_ENTERED')
+                logger.info("Status updated for %s serials in one batch", len(data))
+            return results
+            
+        except Exception as e:
+            error_msg = f"Failed to update status for {len(updates)} serials: {e}"
+            logger.error(error_msg, exc_info=DEBUG_TRACEBACKS)
+            raise GSheetApiClientError(error_msg) from e
 
 # 全域實例管理
 _gsheet_connector: Optional[AsyncGSheetConnector] = None
@@ -200,4 +583,15 @@ async def get_gsheet_connector() -> AsyncGSheetConnector:
         if _gsheet_connector is None:
             _gsheet_connector = AsyncGSheetConnector()
             logger.info("Created new AsyncGSheetConnector instance")
-        return _gsheet_connector
\ No newline at end of file
+        return _gsheet_connector
+
+# FastAPI 依賴注入函數
+async def get_gsheet(request: Request) -> AsyncGSheetConnector:
+    """
+    FastAPI 依賴注入函數，提供啟動時預熱並存放於 app.state 的連接器
+    若啟動流程尚未設定，則退回使用全域單例
+    """
+    connector = getattr(request.app.state, 'gsheet_connector', None)
+    if connector is None:
+        connector = await get_gsheet_connector()
+    return connector
\ No newline at end of file
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+from typing import Any, List, Optional, Set, Tuple
+
+from config import settings
+from utils.async_gsheet_connector import AsyncGSheetConnector, get_gsheet_connector
+
+logger = logging.getLogger(__name__)
+
+# 佇列中的停止標記，讓背景任務在寫完先前的資料後自行結束
+_STOP = object()
+
+# 批次寫入失敗後的重試等待時間（秒），重試次數即為元組長度
+_FLUSH_RETRY_DELAYS = (1.0, 3.0)
+
+# 關閉時等待寫入失敗通知郵件的時間上限（秒）
+_NOTIFY_TIMEOUT_SECONDS = 10.0
+
+class GSheetAppendBatcher:
+    """
+    Google Sheets 寫入批次器
+    將短時間內併發的多筆新增合併為一次 append_rows 呼叫，
+    讓回覆使用者不必等待 Sheets API 往返
+    """
+
+    def __init__(self, connector: AsyncGSheetConnector, window_ms: int = 100, max_batch_size: int = 50):
+        self._connector = connector
+        self._window = window_ms / 1000
+        self._max_batch_size = max_batch_size
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._flush_task: Optional[asyncio.Task] = None
+        # 佇列累積達批次上限時設定，讓背景任務不必等完時間窗口
+        self._batch_full = asyncio.Event()
+        # 保留寫入失敗通知任務的強參照，避免任務在執行途中被垃圾回收
+        self._notify_tasks: Set[asyncio.Task] = set()
+
+    def start(self):
+        """啟動背景寫入任務（重複呼叫不會建立多個任務）"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._run())
+            logger.info("GSheet append batcher started (window=%.0fms)", self._window * 1000)
+
+    async def reserve_serial(self) -> int:
+        """分配序號（由連接器的本地計數器遞增，不需等待佇列寫入）"""
+        return await self._connector.get_new_serial()
+
+    def enqueue(self, row_data: List[Any]) -> asyncio.Future:
+        """
+        將資料列排入寫入佇列，立即返回
+        :param row_data: 完整的資料列，第一欄應為 reserve_serial() 分配的序號
+        :return: 該資料列所屬批次寫入完成（或失敗）時完成的 Future，呼叫端可選擇是否等待
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((row_data, future))
+        # 背景任務已取出一筆資料在等待窗口，佇列中再有 max_batch_size - 1 筆即可寫滿一批
+        if self._queue.qsize() >= self._max_batch_size - 1:
+            self._batch_full.set()
+        return future
+
+    def _drain(self, batch: List[Tuple[List[Any], asyncio.Future]]) -> bool:
+        """
+        取出佇列中已排入的資料列，直到達到批次上限
+        :return: 是否遇到停止標記
+        """
+        while len(batch) < self._max_batch_size and not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is _STOP:
+                return True
+            batch.append(item)
+        return False
+
+    async def _flush(self, batch: List[Tuple[List[Any], asyncio.Future]]):
+        """以單次 API 呼叫寫入整批資料列，並通知各資料列的等待者"""
+        rows = [row for row, _ in batch]
+        for attempt in range(len(_FLUSH_RETRY_DELAYS) + 1):
+            try:
+                await self._connector.append_rows(rows)
+                logger.info("Flushed %s rows to GSheet in one batch", len(rows))
+                break
+            except Exception as e:
+                if attempt < len(_FLUSH_RETRY_DELAYS):
+                    # 多為暫時性錯誤（例如配額限制），稍候以同一批資料重試；期間新資料繼續在佇列累積
+                    delay = _FLUSH_RETRY_DELAYS[attempt]
+                    logger.warning("Failed to flush %s rows to GSheet: %s; retrying in %ss", len(rows), e, delay)
+                    await asyncio.sleep(delay)
+                    continue
+                # 序號已回覆給使用者，記錄完整資料以便人工補登
+                logger.error("Failed to flush %s rows to GSheet: %s; rows=%s", len(rows), e, rows)
+                self._notify_failure(rows, e)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                        # 呼叫端不一定會等待結果，標記為已讀取以免 asyncio 重複警告
+                        future.exception()
+                return
+
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    def _notify_failure(self, rows: List[List[Any]], error: Exception):
+        """於背景通知管理員寫入失敗的資料列，不阻塞後續批次"""
+        task = asyncio.create_task(self._send_failure_email(rows, error))
+        self._notify_tasks.add(task)
+        task.add_done_callback(self._notify_tasks.discard)
+
+    @staticmethod
+    async def _send_failure_email(rows: List[List[Any]], error: Exception):
+        """發送寫入失敗通知郵件，列出需人工補登的資料列"""
+        # 延遲匯入，讓批次器不必在載入時依賴郵件模組
+        from services.async_email_sender import send_notification_email
+
+        row_lines = "\n".join(", ".join(str(value) for value in row) for row in rows)
+        try:
+            await send_notification_email(
+                subject=f"Google Sheets 寫入失敗 - {len(rows)} 筆資料需人工補登",
+                body=f"以下資料列在重試 {len(_FLUSH_RETRY_DELAYS)} 次後仍無法寫入 Google Sheets：{error}\n\n{row_lines}"
+            )
+        except Exception as e:
+            logger.error("Failed to send GSheet flush failure email for %s rows: %s", len(rows), e)
+
+    async def _run(self):
+        """
+        背景任務：自適應批次寫入
+        佇列閒置時立即寫入單筆資料，不增加延遲；有併發資料時才等待一個時間窗口收集更多資料，
+        累積達批次上限時提前寫入。
+        寫入期間（gspread-asyncio 會限制 API 呼叫間隔）新到的資料也會自然累積到下一批。
+        """
+        while True:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            self._batch_full.clear()
+            if not self._queue.empty() and self._queue.qsize() < self._max_batch_size - 1:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), timeout=self._window)
+                except asyncio.TimeoutError:
+                    pass
+            stop = self._drain(batch)
+            await self._flush(batch)
+            if stop:
+                return
+
+    async def close(self):
+        """停止背景任務，並等待佇列中剩餘的資料寫入完成"""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._queue.put_nowait(_STOP)
+            await self._flush_task
+        self._flush_task = None
+        # 需在關閉 SMTP 連線之前送出寫入失敗通知
+        if self._notify_tasks:
+            _, not_done = await asyncio.wait(list(self._notify_tasks), timeout=_NOTIFY_TIMEOUT_SECONDS)
+            if not_done:
+                logger.warning("%s GSheet failure emails still pending after %ss",
+                               len(not_done), _NOTIFY_TIMEOUT_SECONDS)
+
+# 全域實例管理
+_gsheet_batcher: Optional[GSheetAppendBatcher] = None
+
+async def get_gsheet_batcher() -> GSheetAppendBatcher:
+    """獲取全域 Google Sheets 寫入批次器實例"""
+    global _gsheet_batcher
+    if _gsheet_batcher is None:
+        connector = await get_gsheet_connector()
+        _gsheet_batcher = GSheetAppendBatcher(
+            connector,
+            window_ms=settings.GSHEET_BATCH_WINDOW_MS,
+            max_batch_size=settings.GSHEET_BATCH_MAX_SIZE
+        )
+        logger.info("Created new GSheetAppendBatcher instance")
+    return _gsheet_batcher
+
+async def close_gsheet_batcher():
+    """應用程式關閉時調用，確保佇列中的資料全部寫入"""
+    global _gsheet_batcher
+    if _gsheet_batcher is not None:
+        await _gsheet_batcher.close()
+        _gsheet_batcher = None
+        logger.info("GSheet append batcher has been closed and reset")
\ No newline at end of file
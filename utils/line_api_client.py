@@ -1,8 +1,10 @@
 import asyncio
 import logging
 from typing import Optional, Dict, Any
+import ssl
+import time
 from contextlib import asynccontextmanager
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 from linebot.v3.messaging import (
     AsyncApiClient,
@@ -14,6 +16,12 @@ from config import settings
 
 logger = logging.getLogger(__name__)
 
+# LINE API 的 aiohttp 連線池設定：延長 keep-alive 與 DNS 快取時間，讓 TLS 連線在請求間重用
+_HTTP_POOL_LIMIT = 100
+_HTTP_POOL_LIMIT_PER_HOST = 50
+_HTTP_KEEPALIVE_TIMEOUT = 75
+_HTTP_DNS_CACHE_TTL = 300
+
 class LineApiManager:
     """
     LINE API 客戶端管理器，負責管理 AsyncApiClient 的生命週期
@@ -26,28 +34,34 @@ class LineApiManager:
         self._lock = asyncio.Lock()
         self._is_closing = False
         self._initialized_at: Optional[datetime] = None
+        # 初始化時預先計算的 ISO 字串與單調時間，供健康檢查與指標直接使用
+        self._initialized_at_iso: Optional[str] = None
+        self._init_monotonic: Optional[float] = None
         
-        # 監控指標
-        self._metrics = {
-            'total_requests': 0,
-            'failed_requests': 0,
-            'last_request_time': None,
-            'initialization_time': None,
-            'created_at': datetime.now(timezone.utc).isoformat()
-        }
+        # 監控指標；每次請求只更新整數計數器與單調時間（asyncio 單執行緒下不需加鎖），
+        # 時間字串在 get_metrics() 時才產生
+        self._total_requests = 0
+        self._failed_requests = 0
+        self._last_request_monotonic: Optional[float] = None
+        self._initialization_time: Optional[float] = None
+        self._created_at_iso = datetime.now(timezone.utc).isoformat()
     
     async def get_messaging_api(self) -> MessagingApi:
         """
         獲取 MessagingApi 實例，如果不存在則創建
-        使用鎖確保線程安全
+        已初始化時直接返回，僅在首次創建時使用鎖確保線程安全
         """
+        # 快速路徑：初始化後實例不再變動，不需進入鎖或例外處理
+        api = self._messaging_api
+        if api is not None and not self._is_closing:
+            self._record_request()
+            return api
+        
         if self._is_closing:
             raise RuntimeError("LineApiManager is closing, cannot create new connections")
         
-        start_time = datetime.now(timezone.utc)
         try:
-            self._metrics['total_requests'] += 1
-            self._metrics['last_request_time'] = start_time.isoformat()
+            self._record_request()
             
             async with self._lock:
                 if self._messaging_api is None:
@@ -55,10 +69,51 @@ class LineApiManager:
                 return self._messaging_api
                 
         except Exception as e:
-            self._metrics['failed_requests'] += 1
-            logger.error(f"Failed to get messaging API: {e}")
+            self._failed_requests += 1
+            logger.error("Failed to get messaging API: %s", e)
             raise
     
+    def _record_request(self):
+        """記錄一次 get_messaging_api 呼叫"""
+        self._total_requests += 1
+        self._last_request_monotonic = time.monotonic()
+    
+    async def _tune_http_session(self, configuration: Configuration):
+        """
+        以調整過的連線池取代 SDK 預設建立的 aiohttp session
+        SDK 未提供注入 session 的參數，此處依賴 line-bot-sdk==3.17.1 的內部結構
+        （AsyncApiClient.rest_client.pool_manager 為 aiohttp.ClientSession），升級 SDK 時需重新確認；
+        若內部結構不符預期則保留預設 session
+        """
+        import aiohttp
+        
+        rest_client = getattr(self._client, 'rest_client', None)
+        default_session = getattr(rest_client, 'pool_manager', None)
+        if not isinstance(default_session, aiohttp.ClientSession):
+            logger.warning("Unexpected AsyncApiClient internals, keeping default HTTP session")
+            return
+        
+        ssl_context = ssl.create_default_context(cafile=configuration.ssl_ca_cert)
+        if not configuration.verify_ssl:
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+        
+        connector = aiohttp.TCPConnector(
+            limit=_HTTP_POOL_LIMIT,
+            limit_per_host=_HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=_HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=_HTTP_DNS_CACHE_TTL,
+            ssl=ssl_context
+        )
+        rest_client.pool_manager = aiohttp.ClientSession(
+            connector=connector,
+            # 0 表示不設總逾時，與 SDK 預設 session 一樣只受各請求的 _request_timeout 限制
+            timeout=aiohttp.ClientTimeout(total=settings.LINE_HTTP_TIMEOUT_SECONDS or None),
+            trust_env=True
+        )
+        await default_session.close()
+        logger.debug("LINE API HTTP session tuned")
+    
     async def _initialize_client(self):
         """初始化 LINE API 客戶端"""
         init_start = datetime.now(timezone.utc)
@@ -74,20 +129,23 @@ class LineApiManager:
             # 創建客戶端
             configuration = Configuration(access_token=settings.LINE_CHANNEL_ACCESS_TOKEN)
             self._client = AsyncApiClient(configuration)
+            await self._tune_http_session(configuration)
             self._messaging_api = MessagingApi(self._client)
             self._initialized_at = datetime.now(timezone.utc)
+            self._initialized_at_iso = self._initialized_at.isoformat()
+            self._init_monotonic = time.monotonic()
             
             # 記錄初始化時間
             init_duration = (datetime.now(timezone.utc) - init_start).total_seconds()
-            self._metrics['initialization_time'] = init_duration
+            self._initialization_time = init_duration
             
-            logger.info(f"LINE API client initialized successfully in {init_duration:.3f}s")
+            logger.info("LINE API client initialized successfully in %.3fs", init_duration)
             
         except ValueError as e:
-            logger.error(f"Configuration error: {e}")
+            logger.error("Configuration error: %s", e)
             raise
         except Exception as e:
-            logger.error(f"Failed to initialize LINE API client: {e}")
+            logger.error("Failed to initialize LINE API client: %s", e)
             # 確保清理狀態
             self._client = None
             self._messaging_api = None
@@ -105,13 +163,15 @@ class LineApiManager:
                     await asyncio.wait_for(self._client.close(), timeout=timeout)
                     logger.info("LINE API client closed successfully")
                 except asyncio.TimeoutError:
-                    logger.warning(f"LINE API client close timed out after {timeout}s")
+                    logger.warning("LINE API client close timed out after %ss", timeout)
                 except Exception as e:
-                    logger.error(f"Error closing LINE API client: {e}")
+                    logger.error("Error closing LINE API client: %s", e)
                 finally:
                     self._client = None
                     self._messaging_api = None
                     self._initialized_at = None
+                    self._initialized_at_iso = None
+                    self._init_monotonic = None
     
     async def health_check(self) -> Dict[str, Any]:
         """
@@ -163,20 +223,20 @@ class LineApiManager:
             #     })
             #     return health_info
             
-            # 所有檢查通過
+            # 所有檢查通過；只計算一次單調時間差，不建立額外的 datetime
             health_info.update({
                 'is_healthy': True,
                 'status': 'healthy',
                 'details': {
-                    'initialized_at': self._initialized_at.isoformat() if self._initialized_at else None,
+                    'initialized_at': self._initialized_at_iso,
                     'uptime_seconds': (
-                        datetime.now(timezone.utc) - self._initialized_at
-                    ).total_seconds() if self._initialized_at else None
+                        time.monotonic() - self._init_monotonic
+                    ) if self._init_monotonic is not None else None
                 }
             })
             
         except Exception as e:
-            logger.error(f"Health check failed: {e}")
+            logger.error("Health check failed: %s", e)
             health_info.update({
                 'is_healthy': False,
                 'status': 'error',
@@ -187,13 +247,20 @@ class LineApiManager:
     
     def get_metrics(self) -> Dict[str, Any]:
         """獲取監控指標"""
-        metrics = self._metrics.copy()
-        metrics.update({
+        last_request_time = None
+        if self._last_request_monotonic is not None:
+            elapsed = time.monotonic() - self._last_request_monotonic
+            last_request_time = (datetime.now(timezone.utc) - timedelta(seconds=elapsed)).isoformat()
+        return {
+            'total_requests': self._total_requests,
+            'failed_requests': self._failed_requests,
+            'last_request_time': last_request_time,
+            'initialization_time': self._initialization_time,
+            'created_at': self._created_at_iso,
             'is_initialized': self._messaging_api is not None,
             'is_closing': self._is_closing,
-            'initialized_at': self._initialized_at.isoformat() if self._initialized_at else None
-        })
-        return metrics
+            'initialized_at': self._initialized_at_iso
+        }
 
 # 全域單例實例管理
 _line_api_manager: Optional[LineApiManager] = None
@@ -258,7 +325,7 @@ async def line_api_health_check() -> Dict[str, Any]:
         manager = await get_line_api_manager()
         return await manager.health_check()
     except Exception as e:
-        logger.error(f"LINE API health check failed: {e}")
+        logger.error("LINE API health check failed: %s", e)
         return {
             'is_healthy': False,
             'status': 'error',
@@ -273,7 +340,7 @@ async def get_line_api_metrics() -> Dict[str, Any]:
         manager = await get_line_api_manager()
         return manager.get_metrics()
     except Exception as e:
-        logger.error(f"Failed to get LINE API metrics: {e}")
+        logger.error("Failed to get LINE API metrics: %s", e)
         return {
             'error': str(e),
             'timestamp': datetime.now(timezone.utc).isoformat()
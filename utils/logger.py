@@ -2,17 +2,35 @@ import logging
 import sys
 from config import settings
 
+# 只有在 DEBUG 級別時才於錯誤日誌附上完整 traceback；
+# 其他級別下錯誤訊息已足夠，避免錯誤高峰時花費 CPU 格式化堆疊
+DEBUG_TRACEBACKS = settings.LOG_LEVEL.upper() == "DEBUG"
+
+# 日誌格式未使用執行緒、行程資訊，關閉後每筆 LogRecord 不再呼叫 get_ident()/getpid()
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+# 正式環境中不讓處理器的錯誤輸出額外的 traceback
+logging.raiseExceptions = False
+
+_CONFIGURED = False
+
 def setup_logging():
     """
     設定全域根日誌記錄器 (root logger)。
     從設定檔讀取日誌級別，並將日誌輸出到標準輸出。
-    此函數應在應用程式啟動時僅調用一次。
+    此函數應在應用程式啟動時僅調用一次，重複調用會直接返回。
     """
+    global _CONFIGURED
+    if _CONFIGURED:
+        return
+
     # 獲取根日誌記錄器
     root_logger = logging.getLogger()
 
     # 如果根記錄器已經有處理器，則直接返回，防止日誌重複輸出
     if root_logger.handlers:
+        _CONFIGURED = True
         return
 
     # 從設定檔設定日誌級別
@@ -25,4 +43,5 @@ def setup_logging():
     )
     handler.setFormatter(formatter)
     root_logger.addHandler(handler)
+    _CONFIGURED = True
     logging.info(f"Logging configured with level: {settings.LOG_LEVEL}")
\ No newline at end of file
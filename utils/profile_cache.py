@@ -0,0 +1,65 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from linebot.v3.messaging import MessagingApi
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class ProfileCache:
+    """
+    LINE 使用者顯示名稱的 TTL + LRU 快取
+    重複登記的使用者可直接命中快取，省去 get_profile 的 HTTPS 往返
+    """
+
+    def __init__(self, ttl_seconds: float = 600, max_size: int = 10_000):
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._ttl = ttl_seconds
+        self._max_size = max_size
+
+    def get(self, user_id: str) -> Optional[str]:
+        """取得未過期的顯示名稱，並標記為最近使用"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+
+        display_name, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[user_id]
+            return None
+
+        self._entries.move_to_end(user_id)
+        return display_name
+
+    def set(self, user_id: str, display_name: str):
+        """寫入顯示名稱，超過容量時淘汰最久未使用的項目"""
+        self._entries[user_id] = (display_name, time.monotonic() + self._ttl)
+        self._entries.move_to_end(user_id)
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        """移除指定使用者的快取"""
+        self._entries.pop(user_id, None)
+
+# 創建一個全域單例，方便在應用程式各處使用
+profile_cache = ProfileCache(
+    ttl_seconds=settings.PROFILE_CACHE_TTL_SECONDS,
+    max_size=settings.PROFILE_CACHE_MAX_SIZE
+)
+
+async def get_display_name(messaging_api: MessagingApi, user_id: str) -> str:
+    """
+    獲取使用者顯示名稱，快取未命中時才呼叫 LINE API
+    API 錯誤會直接拋出，由呼叫端決定預設值
+    """
+    display_name = profile_cache.get(user_id)
+    if display_name is not None:
+        return display_name
+
+    profile = await messaging_api.get_profile(user_id)
+    profile_cache.set(user_id, profile.display_name)
+    logger.debug("Cached display name for %s", user_id)
+    return profile.display_name
\ No newline at end of file
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from email.message import Message
+from typing import Optional
+
+import aiosmtplib
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class SmtpClientManager:
+    """
+    SMTP 客戶端管理器，負責維護一條持久的 aiosmtplib 連線
+    避免每封郵件都重新進行 TCP + TLS + AUTH 握手
+    """
+
+    def __init__(self, keepalive_interval: float = 60.0):
+        self._client: Optional[aiosmtplib.SMTP] = None
+        self._lock = asyncio.Lock()
+        self._keepalive_interval = keepalive_interval
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._is_closing = False
+
+    def _create_client(self) -> aiosmtplib.SMTP:
+        """建立 SMTP 客戶端（提供帳號密碼時，connect() 會自動登入）"""
+        return aiosmtplib.SMTP(
+            hostname=settings.SMTP_SERVER,
+            port=settings.SMTP_PORT,
+            username=settings.SMTP_USERNAME,
+            password=settings.SMTP_PASSWORD,
+            use_tls=True
+        )
+
+    async def _ensure_connected(self) -> aiosmtplib.SMTP:
+        """確保連線可用，必須在持有鎖的情況下呼叫"""
+        if self._client is None:
+            self._client = self._create_client()
+
+        if not self._client.is_connected:
+            await self._client.connect()
+            logger.info("SMTP connection established")
+
+        if self._keepalive_task is None or self._keepalive_task.done():
+            self._keepalive_task = asyncio.create_task(self._keepalive())
+
+        return self._client
+
+    async def send_message(self, message: Message):
+        """
+        使用持久連線發送郵件
+        若伺服器已中斷連線，重新連線後重試一次
+        """
+        if self._is_closing:
+            raise RuntimeError("SmtpClientManager is closing, cannot send messages")
+
+        async with self._lock:
+            client = await self._ensure_connected()
+            try:
+                return await client.send_message(message)
+            except aiosmtplib.SMTPServerDisconnected:
+                logger.warning("SMTP server disconnected, reconnecting and retrying once")
+                client.close()
+                client = await self._ensure_connected()
+                return await client.send_message(message)
+
+    async def _keepalive(self):
+        """定期發送 NOOP，避免伺服器端因閒置而中斷連線"""
+        while not self._is_closing:
+            await asyncio.sleep(self._keepalive_interval)
+            async with self._lock:
+                if self._client is None or not self._client.is_connected:
+                    continue
+                try:
+                    await self._client.noop()
+                except aiosmtplib.SMTPException as e:
+                    # 連線已失效，下次發送時會重新建立
+                    logger.warning("SMTP keepalive NOOP failed: %s", e)
+                    self._client.close()
+
+    async def close(self, timeout: float = 5.0):
+        """正確關閉 SMTP 連線，釋放資源"""
+        self._is_closing = True
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+
+        async with self._lock:
+            if self._client is not None and self._client.is_connected:
+                try:
+                    await asyncio.wait_for(self._client.quit(), timeout=timeout)
+                    logger.info("SMTP connection closed successfully")
+                except asyncio.TimeoutError:
+                    logger.warning("SMTP quit timed out after %ss", timeout)
+                    self._client.close()
+                except Exception as e:
+                    logger.error("Error closing SMTP connection: %s", e)
+                    self._client.close()
+            self._client = None
+
+# 全域單例實例管理
+_smtp_manager: Optional[SmtpClientManager] = None
+
+def get_smtp_manager() -> SmtpClientManager:
+    """獲取全域 SMTP 客戶端管理器實例"""
+    global _smtp_manager
+    if _smtp_manager is None:
+        _smtp_manager = SmtpClientManager(keepalive_interval=settings.SMTP_KEEPALIVE_INTERVAL)
+        logger.info("Created new SmtpClientManager instance")
+    return _smtp_manager
+
+# 優雅關閉函數
+async def close_smtp_client():
+    """應用程式關閉時調用，發送 QUIT 並關閉持久連線"""
+    global _smtp_manager
+    if _smtp_manager is not None:
+        await _smtp_manager.close()
+        _smtp_manager = None
+        logger.info("SMTP client manager has been closed and reset")
\ No newline at end of file